@@ -8,9 +8,15 @@
 #include <functional>
 
 // Handles sending formatted commands and processing received commands via SerialUSB.
+//
+// In text mode every command is one ASCII line. In framed mode commands are sent
+// as compact binary frames, decoded again by py/serial_frames.py:
+//   SYNC | LEN | TYPE | SEQ | PAYLOAD (LEN bytes) | CRC8 (over LEN..PAYLOAD)
+// The first frame after boot is an empty FRAME_START, so the receiver can tell
+// a controller reset from lost frames.
 class SerialCommunicator {
 public:
-    SerialCommunicator();
+    explicit SerialCommunicator(bool framed = false);
 
     // Call this frequently in the main loop to process incoming serial data.
     void processInput();
@@ -24,6 +30,12 @@ public:
     void sendDebug(const char* message);
     void sendMessage(const String& message);
 
+    // --- Batching ---
+    // Flux loop/volume updates sent between beginBatch() and endBatch() are
+    // packed into a single frame (framed mode) or a single write (text mode).
+    void beginBatch();
+    void endBatch();
+
 
     // --- Callback Registration (using std::function) ---
     void onModeButtonLedOn(std::function<void()> callback);
@@ -31,17 +43,46 @@ public:
     void onAudioStopped(std::function<void()> callback);
 
 private:
-    String inputBuffer_; // Buffer for assembling incoming lines
+    static const size_t INPUT_BUFFER_SIZE = 64;
+    static const size_t MAX_PAYLOAD = 64;
+    static const size_t TEXT_BATCH_SIZE = 192;
+
+    static const uint8_t FRAME_SYNC = 0xA5;
+    static const uint8_t FRAME_TEXT = 0x01;
+    static const uint8_t FRAME_AUDIO_PLAY = 0x02;
+    static const uint8_t FRAME_VIDEO_PLAY = 0x03;
+    static const uint8_t FRAME_FLUX = 0x04;
+    static const uint8_t FRAME_START = 0x05;
+    static const uint8_t FLUX_LOOP = 0x80;
+    static const uint8_t FLUX_NO_VOLUME = 0xFF;
+
+    bool framed_;
+    bool started_; // FRAME_START sent
+    uint8_t sequence_;
+
+    char inputBuffer_[INPUT_BUFFER_SIZE]; // Buffer for assembling incoming lines
+    size_t inputLength_;
+
+    // Pending batch (flux records in framed mode, lines in text mode)
+    bool batching_;
+    uint8_t fluxBatch_[MAX_PAYLOAD];
+    size_t fluxBatchLength_;
+    char textBatch_[TEXT_BATCH_SIZE];
+    size_t textBatchLength_;
 
     // Callback storage (using std::function)
     std::function<void()> modeButtonLedOnCallback_;
     std::function<void()> modeButtonLedOffCallback_;
     std::function<void()> audioStoppedCallback_;
 
-    // Internal parsing helper
-    void parseCommand(const String& command);
+    // Internal helpers
+    void parseCommand(const char* command);
+    void writeLine(const char* line, size_t length);
+    void writeFrame(uint8_t type, const uint8_t* payload, size_t length);
+    void addFluxRecord(int fluxIndex, bool loop, int volume);
+    static uint8_t crc8(uint8_t crc, const uint8_t* data, size_t length);
 
     // Define the specific string expected to signal audio stop
-    const String STARTED_PLAYING_AUDIO_MSG = "MODE_BUTTON_ON";
-    const String STOPPED_PLAYING_AUDIO_MSG = "MODE_BUTTON_OFF";
+    static constexpr const char* STARTED_PLAYING_AUDIO_MSG = "MODE_BUTTON_ON";
+    static constexpr const char* STOPPED_PLAYING_AUDIO_MSG = "MODE_BUTTON_OFF";
 };
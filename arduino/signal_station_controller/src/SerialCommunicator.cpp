@@ -1,13 +1,21 @@
 #include "SerialCommunicator.h"
+#include <stdio.h>
+#include <string.h>
 #include <utility> // Required for std::move
 
-SerialCommunicator::SerialCommunicator() :
-    inputBuffer_(""),
+SerialCommunicator::SerialCommunicator(bool framed) :
+    framed_(framed),
+    started_(false),
+    sequence_(0),
+    inputLength_(0),
+    batching_(false),
+    fluxBatchLength_(0),
+    textBatchLength_(0),
     modeButtonLedOnCallback_(nullptr),
     modeButtonLedOffCallback_(nullptr),
     audioStoppedCallback_(nullptr)
 {
-    inputBuffer_.reserve(64); // Pre-allocate buffer capacity
+    inputBuffer_[0] = '\0';
 }
 
 // Processes incoming serial data, looking for complete lines.
@@ -19,76 +27,195 @@ void SerialCommunicator::processInput() {
         char receivedChar = SerialUSB.read();
         if (receivedChar == '\n' || receivedChar == '\r') {
             // End of line/command detected
-            if (inputBuffer_.length() > 0) {
-                inputBuffer_.trim();
+            while (inputLength_ > 0 && isspace(inputBuffer_[inputLength_ - 1])) {
+                inputLength_--; // Trim trailing whitespace
+            }
+            if (inputLength_ > 0) {
+                inputBuffer_[inputLength_] = '\0';
                 parseCommand(inputBuffer_);
-                inputBuffer_ = ""; // Clear buffer for next command
+                inputLength_ = 0; // Clear buffer for next command
             }
-        } else {
-            // Append character to buffer. String handles allocation.
-            inputBuffer_ += receivedChar;
+        } else if (inputLength_ == 0 && isspace(receivedChar)) {
+            // Skip leading whitespace
+        } else if (inputLength_ < INPUT_BUFFER_SIZE - 1) {
+            // Append to the fixed buffer, overlong lines are truncated.
+            inputBuffer_[inputLength_++] = receivedChar;
         }
     }
 }
 
 // Parses a complete command string and triggers callbacks.
-void SerialCommunicator::parseCommand(const String& command) {
-    if (command == STARTED_PLAYING_AUDIO_MSG) {
+void SerialCommunicator::parseCommand(const char* command) {
+    if (strcmp(command, STARTED_PLAYING_AUDIO_MSG) == 0) {
         if (modeButtonLedOnCallback_) modeButtonLedOnCallback_();
-    } else if (command == STOPPED_PLAYING_AUDIO_MSG) {
+    } else if (strcmp(command, STOPPED_PLAYING_AUDIO_MSG) == 0) {
         if (modeButtonLedOffCallback_) modeButtonLedOffCallback_();
     }
 }
 
+uint8_t SerialCommunicator::crc8(uint8_t crc, const uint8_t* data, size_t length) {
+    // CRC-8, polynomial 0x07 (matches py/serial_frames.py)
+    for (size_t i = 0; i < length; i++) {
+        crc ^= data[i];
+        for (int bit = 0; bit < 8; bit++) {
+            crc = (crc & 0x80) ? (uint8_t)((crc << 1) ^ 0x07) : (uint8_t)(crc << 1);
+        }
+    }
+    return crc;
+}
+
+void SerialCommunicator::writeFrame(uint8_t type, const uint8_t* payload, size_t length) {
+    if (!SerialUSB || length > MAX_PAYLOAD) {
+        return;
+    }
+    if (!started_) {
+        // Announce the (re)start before the first frame
+        started_ = true;
+        writeFrame(FRAME_START, nullptr, 0);
+    }
+    uint8_t frame[MAX_PAYLOAD + 5];
+    frame[0] = FRAME_SYNC;
+    frame[1] = (uint8_t)length;
+    frame[2] = type;
+    frame[3] = sequence_++;
+    if (length > 0) {
+        memcpy(frame + 4, payload, length);
+    }
+    frame[4 + length] = crc8(0, frame + 1, length + 3);
+    SerialUSB.write(frame, length + 5);
+}
+
+// Writes one text line (without line ending). In a batch it is queued instead.
+void SerialCommunicator::writeLine(const char* line, size_t length) {
+    if (!SerialUSB) {
+        return;
+    }
+    if (framed_) {
+        // Text frames carry at most MAX_PAYLOAD characters
+        if (length > MAX_PAYLOAD) length = MAX_PAYLOAD;
+        writeFrame(FRAME_TEXT, (const uint8_t*)line, length);
+        return;
+    }
+    if (batching_) {
+        if (textBatchLength_ + length + 2 > TEXT_BATCH_SIZE) {
+            SerialUSB.write((const uint8_t*)textBatch_, textBatchLength_);
+            textBatchLength_ = 0;
+        }
+        if (length + 2 <= TEXT_BATCH_SIZE) {
+            memcpy(textBatch_ + textBatchLength_, line, length);
+            textBatchLength_ += length;
+            textBatch_[textBatchLength_++] = '\r';
+            textBatch_[textBatchLength_++] = '\n';
+            return;
+        }
+    }
+    SerialUSB.write((const uint8_t*)line, length);
+    SerialUSB.write((const uint8_t*)"\r\n", 2);
+}
+
+void SerialCommunicator::addFluxRecord(int fluxIndex, bool loop, int volume) {
+    uint8_t record[2] = {
+        (uint8_t)(fluxIndex | (loop ? FLUX_LOOP : 0)),
+        (uint8_t)(volume < 0 ? FLUX_NO_VOLUME : volume)
+    };
+    if (!batching_) {
+        writeFrame(FRAME_FLUX, record, sizeof(record));
+        return;
+    }
+    // Fold a volume update into the loop record of the same flux, as
+    // fluxPotentiometerLogic() always sends the two together.
+    if (!loop && fluxBatchLength_ >= 2 &&
+        fluxBatch_[fluxBatchLength_ - 2] == (uint8_t)(fluxIndex | FLUX_LOOP) &&
+        fluxBatch_[fluxBatchLength_ - 1] == FLUX_NO_VOLUME) {
+        fluxBatch_[fluxBatchLength_ - 1] = record[1];
+        return;
+    }
+    if (fluxBatchLength_ + sizeof(record) > MAX_PAYLOAD) {
+        writeFrame(FRAME_FLUX, fluxBatch_, fluxBatchLength_);
+        fluxBatchLength_ = 0;
+    }
+    memcpy(fluxBatch_ + fluxBatchLength_, record, sizeof(record));
+    fluxBatchLength_ += sizeof(record);
+}
+
+void SerialCommunicator::beginBatch() {
+    batching_ = true;
+}
+
+void SerialCommunicator::endBatch() {
+    batching_ = false;
+    if (!SerialUSB) {
+        fluxBatchLength_ = 0;
+        textBatchLength_ = 0;
+        return;
+    }
+    if (fluxBatchLength_ > 0) {
+        writeFrame(FRAME_FLUX, fluxBatch_, fluxBatchLength_);
+        fluxBatchLength_ = 0;
+    }
+    if (textBatchLength_ > 0) {
+        SerialUSB.write((const uint8_t*)textBatch_, textBatchLength_);
+        textBatchLength_ = 0;
+    }
+}
+
 void SerialCommunicator::sendAudioPlay(const char* mode, int index) {
-    if (SerialUSB) {
-        SerialUSB.print(mode);
-        SerialUSB.print(", play, ");
-        SerialUSB.println(index);
+    if (framed_) {
+        int modeCode = strcmp(mode, "dispatch") == 0 ? 0 : (strcmp(mode, "archive") == 0 ? 1 : -1);
+        if (modeCode >= 0) {
+            uint8_t payload[2] = {(uint8_t)modeCode, (uint8_t)index};
+            writeFrame(FRAME_AUDIO_PLAY, payload, sizeof(payload));
+            return;
+        }
     }
+    char line[48];
+    snprintf(line, sizeof(line), "%s, play, %d", mode, index);
+    writeLine(line, strlen(line));
 }
 
 void SerialCommunicator::sendVideoPlay(int index) {
-     if (SerialUSB) {
-        SerialUSB.print("video, ");
-        SerialUSB.println(index);
-     }
+    if (framed_) {
+        uint8_t payload[1] = {(uint8_t)index};
+        writeFrame(FRAME_VIDEO_PLAY, payload, sizeof(payload));
+        return;
+    }
+    char line[24];
+    snprintf(line, sizeof(line), "video, %d", index);
+    writeLine(line, strlen(line));
 }
 
 void SerialCommunicator::sendFluxVolume(int fluxIndex, int volume) {
-     if (SerialUSB) {
-        SerialUSB.print("flux_");
-        SerialUSB.print(fluxIndex);
-        SerialUSB.print(", volume, ");
-        SerialUSB.println(volume);
-     }
+    if (framed_) {
+        addFluxRecord(fluxIndex, false, volume);
+        return;
+    }
+    char line[32];
+    snprintf(line, sizeof(line), "flux_%d, volume, %d", fluxIndex, volume);
+    writeLine(line, strlen(line));
 }
 
 void SerialCommunicator::sendFluxLoop(int fluxIndex) {
-     if (SerialUSB) {
-        SerialUSB.print("flux_");
-        SerialUSB.print(fluxIndex);
-        SerialUSB.println(", loop, 0");
-     }
+    if (framed_) {
+        addFluxRecord(fluxIndex, true, -1);
+        return;
+    }
+    char line[24];
+    snprintf(line, sizeof(line), "flux_%d, loop, 0", fluxIndex);
+    writeLine(line, strlen(line));
 }
 
 void SerialCommunicator::sendStateChange(const char* stateName) {
-     if (SerialUSB) {
-        SerialUSB.print("[State] Entering ");
-        SerialUSB.println(stateName);
-     }
+    char line[48];
+    snprintf(line, sizeof(line), "[State] Entering %s", stateName);
+    writeLine(line, strlen(line));
 }
 
 void SerialCommunicator::sendDebug(const char* message) {
-     if (SerialUSB) {
-        SerialUSB.println(message);
-     }
+    writeLine(message, strlen(message));
 }
 
 void SerialCommunicator::sendMessage(const String& message) {
-     if (SerialUSB) {
-        SerialUSB.println(message);
-     }
+    writeLine(message.c_str(), message.length());
 }
 
 
@@ -104,4 +231,3 @@ void SerialCommunicator::onModeButtonLedOff(std::function<void()> callback) {
 void SerialCommunicator::onAudioStopped(std::function<void()> callback) {
     audioStoppedCallback_ = std::move(callback);
 }
-
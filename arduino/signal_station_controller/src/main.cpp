@@ -38,6 +38,11 @@ const int dispatchPins[NR_DISPATCHES] = {12, 11, 10, 9, 8, 7, 6, 5};
 
 const int SLEEP_TIMEOUT_S = 60;
 
+// Send compact binary frames instead of text lines. The bridge must then be
+// started with --protocol framed (see py/serial_frames.py).
+const bool USE_FRAMED_SERIAL = false;
+const unsigned long SERIAL_BAUDRATE = 115200;
+
 // --- Global objects ---
 SevenSegmentDigits controlPanelDisplay(2, controlPanelDigitOnPins, controlPanelSegmentsPins);
 SevenSegmentDigits monitorPanelDisplay(2, monitorPanelDigitOnPins, monitorPanelSegmentsPins);
@@ -60,7 +65,7 @@ SystemContext systemContext = {
 StateManager stateManager(&systemContext);
 
 // Global Serial Communicator instance
-SerialCommunicator serialComm;
+SerialCommunicator serialComm(USE_FRAMED_SERIAL);
 
 
 // --- Interrupt Service Routines (ISRs) ---
@@ -101,7 +106,7 @@ void onArchive() {
 
 // --- Arduino Setup ---
 void setup() {
-  SerialUSB.begin(9600);
+  SerialUSB.begin(SERIAL_BAUDRATE);
   // while (!SerialUSB); // Optional wait
 
   // Initialize hardware components
@@ -160,6 +165,8 @@ void fluxPotentiometerLogic() {
   unsigned long currentTime = millis();
   if (currentTime - lastfluxPotiUpdateTime >= FLUX_POTI_UPDATE_INTERVAL) {
     lastfluxPotiUpdateTime = currentTime;
+    // All changed potis of this tick go out in one frame/write
+    serialComm.beginBatch();
     for (int i = 0; i < NUM_FLUX_POTIS; i++) {
       int rawValue = analogRead(fluxPotiPins[i]);
       int volume = map(rawValue, 0, 1023, 0, 100);
@@ -169,6 +176,7 @@ void fluxPotentiometerLogic() {
         serialComm.sendFluxVolume(i, volume);
       }
     }
+    serialComm.endBatch();
   }
 }
 
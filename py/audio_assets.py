@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import time
+import wave
+
+logging.basicConfig(level=logging.INFO,
+                    format="%(asctime)s %(levelname)s: %(message)s")
+
+# Format audio_player.py initialises pygame.mixer with. Assets are transcoded
+# to exactly this so the mixer can use the samples without decoding/resampling.
+MIXER_FREQUENCY = 44100
+MIXER_SIZE = -16  # signed 16 bit
+MIXER_CHANNELS = 2
+
+# Shared with AudioModule so both see the same tracks at the same indices.
+SUPPORTED_FORMATS = ('.wav', '.mp3', '.ogg')
+MANIFEST_VERSION = 2
+
+
+def source_stat(path):
+  stat = os.stat(path)
+  return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def list_sources(track_dir):
+  return [
+      f for f in sorted(os.listdir(track_dir))
+      if f.lower().endswith(SUPPORTED_FORMATS)
+  ]
+
+
+def manifest_is_current(entries, track_dir):
+  """Checks that a module's entries still describe the files in track_dir.
+
+  Compares names, sizes and modification times only (no hashing), so it is
+  cheap enough for every player start.
+  """
+  if not os.path.isdir(track_dir):
+    return False
+  files = list_sources(track_dir)
+  if files != [os.path.basename(e["source"]) for e in entries]:
+    return False
+  for fname, entry in zip(files, entries):
+    stat = source_stat(os.path.join(track_dir, fname))
+    if (stat["size"], stat["mtime_ns"]) != (entry.get("size"),
+                                            entry.get("mtime_ns")):
+      return False
+  return True
+
+
+def file_sha256(path):
+  digest = hashlib.sha256()
+  with open(path, "rb") as f:
+    for chunk in iter(lambda: f.read(1 << 20), b""):
+      digest.update(chunk)
+  return digest.hexdigest()
+
+
+def decode_pcm(path, frequency, channels):
+  cmd = [
+      "ffmpeg", "-v", "error", "-nostdin", "-i", path, "-f", "s16le",
+      "-acodec", "pcm_s16le", "-ar",
+      str(frequency), "-ac",
+      str(channels), "-"
+  ]
+  result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+  if result.returncode != 0:
+    raise RuntimeError(result.stderr.decode(errors="replace").strip())
+  return result.stdout
+
+
+def normalize_loudness(pcm, channels, target_dbfs, frequency, block_s=0.4):
+  """Scales 16 bit PCM to a gated RMS loudness of target_dbfs.
+
+  Mean square is computed over 400 ms blocks, blocks below -70 dBFS and more
+  than 10 dB under the ungated level are ignored (as in EBU R128 gating, but
+  without K-weighting). The gain is limited so peaks stay below full scale.
+  """
+  import numpy as np
+
+  samples = np.frombuffer(pcm, dtype=np.int16).reshape(-1, channels)
+  if not len(samples):
+    return pcm, 0.0
+  x = samples.astype(np.float32) / 32768.0
+  block = max(1, int(frequency * block_s))
+  n_blocks = len(x) // block
+  if n_blocks:
+    blocks = x[:n_blocks * block].reshape(n_blocks, block, channels)
+    power = np.mean(np.square(blocks), axis=(1, 2))
+  else:
+    power = np.mean(np.square(x), keepdims=True).reshape(1)
+  power = power[power > 10**(-70 / 10)]
+  if power.size:
+    power = power[power > np.mean(power) * 10**(-10 / 10)]
+  if not power.size:
+    return pcm, 0.0
+  loudness_db = 10 * np.log10(np.mean(power))
+  gain_db = target_dbfs - loudness_db
+  peak = np.max(np.abs(x))
+  if peak > 0:
+    gain_db = min(gain_db, 20 * np.log10(0.999 / peak))
+  scaled = x * np.float32(10**(gain_db / 20)) * 32768.0
+  out = np.clip(np.rint(scaled), -32768, 32767).astype(np.int16)
+  return out.tobytes(), float(gain_db)
+
+
+def transcode(job):
+  start = time.time()
+  pcm = decode_pcm(job["source_path"], job["frequency"], job["channels"])
+  gain_db = 0.0
+  if job["normalize_dbfs"] is not None:
+    pcm, gain_db = normalize_loudness(pcm, job["channels"],
+                                      job["normalize_dbfs"], job["frequency"])
+  os.makedirs(os.path.dirname(job["output_path"]), exist_ok=True)
+  tmp_path = job["output_path"] + ".tmp"
+  with wave.open(tmp_path, "wb") as w:
+    w.setnchannels(job["channels"])
+    w.setsampwidth(abs(MIXER_SIZE) // 8)
+    w.setframerate(job["frequency"])
+    w.writeframes(pcm)
+  os.replace(tmp_path, job["output_path"])
+  frames = len(pcm) // (job["channels"] * abs(MIXER_SIZE) // 8)
+  return {
+      "frames": frames,
+      "duration_s": frames / job["frequency"],
+      "gain_db": round(gain_db, 2),
+      "transcode_s": time.time() - start,
+  }
+
+
+def load_manifest(path):
+  with open(path) as f:
+    manifest = json.load(f)
+  manifest["base_dir"] = os.path.dirname(os.path.abspath(path))
+  return manifest
+
+
+def manifest_format(manifest):
+  fmt = manifest["format"]
+  return (fmt["frequency"], fmt["size"], fmt["channels"])
+
+
+class AssetPipeline:
+
+  def __init__(self,
+               audio_dir,
+               output_dir,
+               jobs=None,
+               normalize_dbfs=None,
+               frequency=MIXER_FREQUENCY,
+               channels=MIXER_CHANNELS):
+    self.audio_dir = audio_dir
+    self.output_dir = output_dir
+    self.jobs = jobs or os.cpu_count()
+    self.manifest_path = os.path.join(output_dir, "manifest.json")
+    self.settings = {
+        "frequency": frequency,
+        "size": MIXER_SIZE,
+        "channels": channels,
+        "normalize_dbfs": normalize_dbfs,
+    }
+
+  def scan_sources(self):
+    # Same ordering as AudioModule.load_sounds(): sorted file names per module.
+    sources = {}
+    for name in sorted(os.listdir(self.audio_dir)):
+      module_dir = os.path.join(self.audio_dir, name)
+      if not os.path.isdir(module_dir):
+        continue
+      files = list_sources(module_dir)
+      if files:
+        sources[name] = files
+    return sources
+
+  def previous_entries(self):
+    if not os.path.isfile(self.manifest_path):
+      return {}
+    try:
+      manifest = load_manifest(self.manifest_path)
+      if manifest.get("version") != MANIFEST_VERSION:
+        logging.info("Manifest version changed, rebuilding all assets")
+        return {}
+      previous_settings = dict(manifest["format"],
+                               normalize_dbfs=manifest.get("normalize_dbfs"))
+      if previous_settings != self.settings:
+        logging.info("Output settings changed, rebuilding all assets")
+        return {}
+      return {
+          entry["source"]: entry
+          for entries in manifest["modules"].values()
+          for entry in entries
+      }
+    except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+      logging.warning(f"Ignoring unreadable manifest {self.manifest_path}: {e}")
+      return {}
+
+  def overlaps_audio_dir(self):
+    audio_dir = os.path.realpath(self.audio_dir)
+    output_dir = os.path.realpath(self.output_dir)
+    return os.path.commonpath([audio_dir, output_dir]) in (audio_dir,
+                                                            output_dir)
+
+  def run(self):
+    start = time.time()
+    if self.overlaps_audio_dir():
+      # remove_stale() would delete the source WAVs.
+      logging.error(f"Output dir {self.output_dir} overlaps audio dir "
+                    f"{self.audio_dir}, choose a separate folder")
+      return False
+    if shutil.which("ffmpeg") is None:
+      logging.error("ffmpeg not found, leaving assets and manifest unchanged")
+      return False
+    previous = self.previous_entries()
+    sources = self.scan_sources()
+    modules = {name: [None] * len(files) for name, files in sources.items()}
+    pending = {}
+    skipped = 0
+    for name, files in sources.items():
+      for idx, fname in enumerate(files):
+        source = f"{name}/{fname}"
+        source_path = os.path.join(self.audio_dir, name, fname)
+        # Keep the source extension so e.g. DSP001.mp3 and DSP001.wav do not
+        # map to the same output.
+        output = f"{name}/{fname}.wav"
+        stat = source_stat(source_path)
+        entry = previous.get(source)
+        # Only hash new or changed files, so a rerun on an unchanged library
+        # does not read every source.
+        if entry and all(entry.get(k) == v for k, v in stat.items()):
+          sha256 = entry["sha256"]
+        else:
+          sha256 = file_sha256(source_path)
+        if (entry and entry["sha256"] == sha256 and entry["file"] == output
+            and os.path.isfile(os.path.join(self.output_dir, output))):
+          modules[name][idx] = dict(entry, **stat)
+          skipped += 1
+          continue
+        job = dict(self.settings,
+                   source_path=source_path,
+                   output_path=os.path.join(self.output_dir, output))
+        pending[(name, idx)] = (job, dict(stat,
+                                          source=source,
+                                          file=output,
+                                          sha256=sha256))
+
+    failed = 0
+    transcode_s = 0.0
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=self.jobs) as executor:
+      futures = {
+          executor.submit(transcode, job): key
+          for key, (job, _) in pending.items()
+      }
+      for future in concurrent.futures.as_completed(futures):
+        name, idx = futures[future]
+        job, entry = pending[(name, idx)]
+        try:
+          result = future.result()
+        except Exception as e:
+          logging.error(f"{entry['source']}: Error transcoding: {e}")
+          failed += 1
+          # Listed without a file so indices still match the source folder,
+          # the player loads the source itself.
+          entry["file"] = None
+          modules[name][idx] = entry
+          continue
+        transcode_s += result.pop("transcode_s")
+        entry.update(result)
+        modules[name][idx] = entry
+        logging.info(f"{entry['source']}: Transcoded to {entry['file']}")
+
+    self.remove_stale(modules)
+    self.write_manifest(modules)
+    elapsed = time.time() - start
+    logging.info(
+        f"{len(pending) - failed} transcoded, {skipped} unchanged, "
+        f"{failed} failed in {elapsed:.2f}s "
+        f"({transcode_s:.2f}s of work on {self.jobs} workers)")
+    return failed == 0
+
+  def remove_stale(self, modules):
+    keep = {
+        os.path.normpath(os.path.join(self.output_dir, e["file"]))
+        for entries in modules.values() for e in entries if e["file"]
+    }
+    for root, _, files in os.walk(self.output_dir):
+      for fname in files:
+        path = os.path.normpath(os.path.join(root, fname))
+        if fname.endswith(".wav") and path not in keep:
+          os.remove(path)
+          logging.info(f"Removed stale asset {path}")
+
+  def write_manifest(self, modules):
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "format": {
+            "frequency": self.settings["frequency"],
+            "size": self.settings["size"],
+            "channels": self.settings["channels"],
+        },
+        "normalize_dbfs": self.settings["normalize_dbfs"],
+        "modules": modules,
+    }
+    os.makedirs(self.output_dir, exist_ok=True)
+    tmp_path = self.manifest_path + ".tmp"
+    with open(tmp_path, "w") as f:
+      json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, self.manifest_path)
+    logging.info(f"Wrote manifest {self.manifest_path}")
+
+
+def benchmark_load(audio_dir, manifest_path):
+  """Times AudioModule-style loading of the sources vs. the manifest assets."""
+  os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+  import pygame
+
+  manifest = load_manifest(manifest_path)
+  pygame.mixer.init(frequency=manifest["format"]["frequency"],
+                    size=manifest["format"]["size"],
+                    channels=manifest["format"]["channels"],
+                    allowedchanges=0)
+  # Only tracks that have an asset, the others load from source either way.
+  entries = [
+      e for module_entries in manifest["modules"].values()
+      for e in module_entries if e["file"]
+  ]
+
+  start = time.time()
+  for entry in entries:
+    try:
+      pygame.mixer.Sound(os.path.join(audio_dir, entry["source"]))
+    except Exception as e:
+      logging.error(f"{entry['source']}: Error loading: {e}")
+  source_s = time.time() - start
+
+  start = time.time()
+  for entry in entries:
+    with wave.open(os.path.join(manifest["base_dir"], entry["file"])) as w:
+      pygame.mixer.Sound(buffer=w.readframes(w.getnframes()))
+  manifest_s = time.time() - start
+
+  pygame.mixer.quit()
+  logging.info(f"Player startup load: sources {source_s:.2f}s, "
+               f"manifest {manifest_s:.2f}s, "
+               f"saved {source_s - manifest_s:.2f}s")
+
+
+def main():
+  parser = argparse.ArgumentParser(
+      description="Transcode data/sounds/* to mixer-native WAV + manifest")
+  parser.add_argument("--audio_dir",
+                      type=str,
+                      default=os.path.join(os.getcwd(), "data", "sounds"),
+                      help="Source library, one sub folder per module")
+  parser.add_argument("--output_dir",
+                      type=str,
+                      default=os.path.join(os.getcwd(), "data",
+                                           "sounds_mixer"),
+                      help="Output folder for WAV files and manifest.json")
+  parser.add_argument("--jobs",
+                      type=int,
+                      default=None,
+                      help="Parallel transcodes (default: CPU count)")
+  parser.add_argument("--normalize_dbfs",
+                      type=float,
+                      default=None,
+                      help="Normalize loudness to this level, e.g. -20")
+  parser.add_argument("--benchmark_load",
+                      action="store_true",
+                      help="Report player load time saved (needs pygame)")
+  args = parser.parse_args()
+
+  pipeline = AssetPipeline(args.audio_dir,
+                           args.output_dir,
+                           jobs=args.jobs,
+                           normalize_dbfs=args.normalize_dbfs)
+  ok = pipeline.run()
+  if args.benchmark_load and os.path.isfile(pipeline.manifest_path):
+    benchmark_load(args.audio_dir, pipeline.manifest_path)
+  if not ok:
+    exit(1)
+
+
+if __name__ == "__main__":
+  main()
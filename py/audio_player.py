@@ -4,13 +4,16 @@ import threading
 import time
 import os
 import logging
+import wave
 import pygame
 
+from audio_assets import (MIXER_CHANNELS, MIXER_FREQUENCY, MIXER_SIZE,
+                          MANIFEST_VERSION, SUPPORTED_FORMATS, load_manifest,
+                          manifest_format, manifest_is_current)
+
 logging.basicConfig(level=logging.INFO,
                     format="%(asctime)s %(levelname)s: %(message)s")
 
-SUPPORTED_FORMATS = ('.wav', '.mp3', '.ogg')
-
 
 class UDPModeSender:
 
@@ -34,13 +37,15 @@ class AudioModule:
                track_dirs,
                channel_id,
                cooldown=0.5,
-               udp_sender=None):
+               udp_sender=None,
+               manifest=None):
     self.names = names
     self.track_dirs = track_dirs
     self.channel_id = channel_id
     self.cooldown = cooldown
     self.last_command_time = 0
     self.udp_sender = udp_sender
+    self.manifest = manifest
     self.playing = False
     self.sounds = self.load_sounds()
     self.channel = pygame.mixer.Channel(channel_id)
@@ -49,6 +54,13 @@ class AudioModule:
   def load_sounds(self):
     sounds_dict = {}
     for name, track_dir in zip(self.names, self.track_dirs):
+      if self.manifest and name in self.manifest["modules"]:
+        if manifest_is_current(self.manifest["modules"][name], track_dir):
+          sounds_dict[name] = self.load_manifest_sounds(name, track_dir)
+          continue
+        logging.warning(f"{name}: Manifest is out of date for {track_dir}, "
+                        f"loading sources (rerun audio_assets.py)")
+
       sounds_in_dir = []
       if not os.path.isdir(track_dir):
         logging.warning(f"Directory not found for {name}: {track_dir}")
@@ -70,6 +82,33 @@ class AudioModule:
       sounds_dict[name] = sounds_in_dir
     return sounds_dict
 
+  def load_manifest_sounds(self, name, track_dir):
+    # Assets are already in the mixer format, so hand the raw samples to the
+    # mixer instead of letting SDL probe, decode and resample the file.
+    sounds = []
+    for entry in self.manifest["modules"][name]:
+      sound = None
+      if entry["file"] is not None:
+        path = os.path.join(self.manifest["base_dir"], entry["file"])
+        try:
+          with wave.open(path) as w:
+            sound = pygame.mixer.Sound(buffer=w.readframes(w.getnframes()))
+        except Exception as e:
+          logging.error(f"{name}: Error loading {path}: {e}, "
+                        f"loading the source instead")
+      if sound is None:
+        # Not transcoded or the asset is broken, load the source as before so
+        # the later tracks keep their indices.
+        path = os.path.join(track_dir, os.path.basename(entry["source"]))
+        try:
+          sound = pygame.mixer.Sound(path)
+        except Exception as e:
+          logging.error(f"{name}: Error loading {path}: {e}")
+          continue
+      sounds.append(sound)
+      logging.info(f"{name}: Loaded sound {path}")
+    return sounds
+
   def set_volume(self, volume_percent):
     vol = max(0.0, min(1.0, volume_percent / 100.0))
     self.channel.set_volume(vol)
@@ -180,9 +219,41 @@ def main():
                       type=str,
                       default=os.path.join(os.getcwd(), "data", "sounds"))
   parser.add_argument("--button_cool_down_s", type=float, default=0.5)
+  parser.add_argument("--manifest",
+                      type=str,
+                      default=None,
+                      help="manifest.json written by audio_assets.py")
   args = parser.parse_args()
 
-  pygame.mixer.init()
+  # allowedchanges=0: SDL converts to the device format internally, so the
+  # mixer format always matches the transcoded assets.
+  pygame.mixer.init(frequency=MIXER_FREQUENCY,
+                    size=MIXER_SIZE,
+                    channels=MIXER_CHANNELS,
+                    allowedchanges=0)
+
+  manifest = None
+  if args.manifest and os.path.isfile(args.manifest):
+    try:
+      manifest = load_manifest(args.manifest)
+      if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"version {manifest.get('version')}, "
+                         f"expected {MANIFEST_VERSION}")
+      if not isinstance(manifest.get("modules"), dict):
+        raise ValueError("no modules")
+      fmt = manifest_format(manifest)
+    except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+      logging.warning(f"Ignoring unreadable manifest {args.manifest}: {e}, "
+                      f"loading sources from {args.audio_dir}")
+      manifest = None
+    if manifest and fmt != pygame.mixer.get_init():
+      logging.warning(
+          f"Manifest format {fmt} does not match mixer "
+          f"{pygame.mixer.get_init()}, loading sources from {args.audio_dir}")
+      manifest = None
+  elif args.manifest:
+    logging.warning(f"Manifest not found: {args.manifest}, loading sources "
+                    f"from {args.audio_dir}")
 
   module_names = [["flux_0"], ["flux_1"], ["flux_2"], ["flux_3"],
                   ["dispatch", "archive"]]
@@ -190,6 +261,7 @@ def main():
   pygame.mixer.set_num_channels(len(module_names))
   modules = {}
   udp_sender = UDPModeSender(host=args.udp_send_host, port=args.udp_send_port)
+  load_start = time.time()
 
   for idx, names_in_group in enumerate(module_names):
     module_paths = [os.path.join(args.audio_dir, n) for n in names_in_group]
@@ -199,9 +271,12 @@ def main():
                                   module_paths,
                                   idx,
                                   cooldown=args.button_cool_down_s,
-                                  udp_sender=sender)
+                                  udp_sender=sender,
+                                  manifest=manifest)
     for name in names_in_group:
       modules[name] = module_instance
+  logging.info(f"Loaded sounds in {time.time() - load_start:.2f}s "
+               f"({'manifest' if manifest else 'sources'})")
 
   controller = MultiChannelController(args.udp_bind_host, args.udp_bind_port,
                                       modules)
@@ -0,0 +1,806 @@
+#!/usr/bin/env python3
+import argparse
+import collections
+import heapq
+import http.server
+import json
+import logging
+import os
+import platform
+import select
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tty
+import wave
+
+from serial_frames import FrameEncoder
+
+logging.basicConfig(level=logging.INFO,
+                    format="%(asctime)s %(levelname)s: %(message)s")
+
+PY_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(PY_DIR)
+
+SERIAL_SCRIPT = os.path.join(PY_DIR, "serial_to_udp_bridge.py")
+AUDIO_SCRIPT = os.path.join(PY_DIR, "audio_player.py")
+KODI_SCRIPT = os.path.join(PY_DIR, "kodi_control.py")
+ADB_SCRIPT = os.path.join(PY_DIR, "adb_control.py")
+
+# Mirrors the constants in arduino/signal_station_controller/src/main.cpp.
+NR_ARCHIVE = 33
+NR_DISPATCHES = 8
+NR_VIDEOS = 13
+NUM_FLUX_POTIS = 4
+
+# Log lines each service prints once it is ready to receive UDP.
+READY_MARKERS = {
+    "bridge": "Forwarding serial to UDP targets",
+    "audio": "UDP server listening",
+    "kodi": "UDP server listening",
+    "adb": "Listening for UDP",
+}
+
+FAKE_ADB = """#!{python}
+import json
+import sys
+import time
+
+with open({log!r}, "a") as f:
+  f.write(json.dumps({{"t": time.time(), "args": sys.argv[1:]}}) + "\\n")
+if sys.argv[1:2] == ["devices"]:
+  print("List of devices attached")
+  print("{device}:5555\\tdevice")
+"""
+
+
+def percentiles(values):
+  if not values:
+    return None
+  ordered = sorted(values)
+
+  def pick(p):
+    pos = (len(ordered) - 1) * p / 100.0
+    lo = int(pos)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+  return {
+      "count": len(ordered),
+      "mean": sum(ordered) / len(ordered),
+      "p50": pick(50),
+      "p90": pick(90),
+      "p95": pick(95),
+      "p99": pick(99),
+      "max": ordered[-1],
+  }
+
+
+class FakeArduino:
+  """Pseudo terminal that emits the same traffic as the controller."""
+
+  def __init__(self, encoder_hz, volume_hz, button_hz, protocol="text"):
+    self.encoder_hz = encoder_hz
+    self.volume_hz = volume_hz
+    self.button_hz = button_hz
+    self.encoder = FrameEncoder() if protocol == "framed" else None
+    self.bytes_sent = 0
+    self.bytes_unwritten = 0
+    self.master_fd, self.slave_fd = os.openpty()
+    tty.setraw(self.slave_fd)
+    # A stalled bridge must not block the traffic loop once the pty is full.
+    os.set_blocking(self.master_fd, False)
+    self.port = os.ttyname(self.slave_fd)
+    self.mode = "dispatch"
+    self.audio_selected = 0
+    self.video_selected = 0
+    self.volume = 0
+    self.volume_step = 3
+    self.sent = collections.Counter()
+    self.audio_sends = collections.deque()
+    self.video_sends = collections.defaultdict(collections.deque)
+    self.flux_sends = collections.defaultdict(collections.deque)
+    self.mode_button_on = []
+    self.mode_button_off = 0
+    self.lock = threading.Lock()
+    self.stop_event = threading.Event()
+    self.reader = threading.Thread(target=self.read_loop, daemon=True)
+    logging.info(f"FakeArduino: Serial port at {self.port}")
+
+  def write(self, data):
+    # Returns False if the pty buffer was full and (part of) data was dropped.
+    try:
+      written = os.write(self.master_fd, data)
+    except BlockingIOError:
+      written = 0
+    self.bytes_sent += written
+    self.bytes_unwritten += len(data) - written
+    return written == len(data)
+
+  def write_line(self, line):
+    if self.encoder:
+      return self.write(self.encoder.text(line))
+    return self.write((line + "\r\n").encode())
+
+  def encoder_event(self, count):
+    # Spin the encoder one step, then press its button. Alternates between the
+    # audio and the video encoder like a visitor working both knobs.
+    if count % 2 == 0:
+      nr_tracks = NR_DISPATCHES if self.mode == "dispatch" else NR_ARCHIVE
+      self.audio_selected = (self.audio_selected + 1) % nr_tracks
+      sent_at = time.time()
+      if self.encoder:
+        ok = self.write(self.encoder.audio_play(self.mode, self.audio_selected))
+      else:
+        ok = self.write_line(f"{self.mode}, play, {self.audio_selected}")
+      self.sent["audio_play"] += 1
+      if ok:
+        with self.lock:
+          self.audio_sends.append(sent_at)
+    else:
+      self.video_selected = (self.video_selected + 1) % NR_VIDEOS
+      sent_at = time.time()
+      if self.encoder:
+        ok = self.write(self.encoder.video_play(self.video_selected))
+      else:
+        ok = self.write_line(f"video, {self.video_selected}")
+      self.sent["video_play"] += 1
+      if ok:
+        with self.lock:
+          self.video_sends[self.video_selected].append(sent_at)
+
+  def volume_event(self, count):
+    # Sweep all flux potentiometers up and down, same traffic as one
+    # fluxPotentiometerLogic() tick with every poti changed.
+    if not 0 <= self.volume + self.volume_step <= 100:
+      self.volume_step = -self.volume_step
+    self.volume += self.volume_step
+    lines = []
+    for i in range(NUM_FLUX_POTIS):
+      lines.append(f"flux_{i}, loop, 0")
+      lines.append(f"flux_{i}, volume, {self.volume}")
+    sent_at = time.time()
+    if self.encoder:
+      ok = self.write(
+          self.encoder.flux([(i, True, self.volume)
+                             for i in range(NUM_FLUX_POTIS)]))
+    else:
+      ok = self.write("".join(line + "\r\n" for line in lines).encode())
+    self.sent["flux_loop"] += NUM_FLUX_POTIS
+    self.sent["flux_volume"] += NUM_FLUX_POTIS
+    if ok:
+      with self.lock:
+        for line in lines:
+          self.flux_sends[line.encode()].append(sent_at)
+
+  def button_event(self, count):
+    self.mode = "archive" if self.mode == "dispatch" else "dispatch"
+    self.audio_selected = 0
+    self.write_line(f"[State] Entering {self.mode.capitalize()}")
+    self.sent["state_change"] += 1
+
+  def run_traffic(self, duration_s, check_alive=None):
+    streams = [(self.encoder_hz, self.encoder_event),
+               (self.volume_hz, self.volume_event),
+               (self.button_hz, self.button_event)]
+    start = time.time()
+    schedule = []
+    for idx, (rate, _) in enumerate(streams):
+      if rate > 0:
+        heapq.heappush(schedule, (start, idx, 0))
+    while schedule and not self.stop_event.is_set():
+      due, idx, count = heapq.heappop(schedule)
+      if due - start >= duration_s:
+        continue
+      delay = due - time.time()
+      if delay > 0:
+        time.sleep(delay)
+      if check_alive:
+        check_alive()
+      rate, handler = streams[idx]
+      handler(count)
+      heapq.heappush(schedule, (due + 1.0 / rate, idx, count + 1))
+    return time.time() - start
+
+  def start(self):
+    self.reader.start()
+
+  def read_loop(self):
+    buffer = b""
+    while not self.stop_event.is_set():
+      try:
+        ready, _, _ = select.select([self.master_fd], [], [], 0.1)
+        if not ready:
+          continue
+        buffer += os.read(self.master_fd, 4096)
+      except BlockingIOError:
+        continue
+      except (OSError, ValueError):
+        break
+      *lines, buffer = buffer.split(b"\n")
+      now = time.time()
+      for line in lines:
+        line = line.strip()
+        if line == b"MODE_BUTTON_ON":
+          with self.lock:
+            self.mode_button_on.append(now)
+        elif line == b"MODE_BUTTON_OFF":
+          self.mode_button_off += 1
+
+  def close(self):
+    self.stop_event.set()
+    if self.reader.is_alive():
+      self.reader.join()
+    os.close(self.master_fd)
+    os.close(self.slave_fd)
+
+
+class UDPTap:
+  """Extra bridge send target, records every datagram the bridge forwards."""
+
+  def __init__(self, host, port):
+    self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    self.socket.bind((host, port))
+    self.socket.settimeout(0.1)
+    self.received = []
+    self.stop_event = threading.Event()
+    self.thread = threading.Thread(target=self.run, daemon=True)
+    logging.info(f"UDPTap: Listening on {host}:{port}")
+
+  def run(self):
+    while not self.stop_event.is_set():
+      try:
+        data, _ = self.socket.recvfrom(1024)
+      except socket.timeout:
+        continue
+      except OSError:
+        break
+      self.received.append((time.time(), data))
+
+  def start(self):
+    self.thread.start()
+
+  def close(self):
+    self.stop_event.set()
+    self.thread.join()
+    self.socket.close()
+
+
+class MockKodiHandler(http.server.BaseHTTPRequestHandler):
+
+  def do_POST(self):
+    arrival = time.time()
+    length = int(self.headers.get("Content-Length", 0))
+    payload = json.loads(self.rfile.read(length) or b"{}")
+    method = payload.get("method")
+    self.server.requests[method] += 1
+    if method == "Files.GetSources":
+      result = {"sources": [{"file": self.server.directory, "label": "bench"}]}
+    elif method == "Files.GetDirectory":
+      result = {"files": self.server.files}
+    elif method == "Player.Open":
+      file_path = payload.get("params", {}).get("item", {}).get("file")
+      with self.server.lock:
+        self.server.player_open.append((arrival, file_path))
+      result = "OK"
+    else:
+      result = None
+    body = json.dumps({
+        "jsonrpc": "2.0",
+        "id": payload.get("id"),
+        "result": result
+    }).encode()
+    self.send_response(200)
+    self.send_header("Content-Type", "application/json")
+    self.send_header("Content-Length", str(len(body)))
+    self.end_headers()
+    self.wfile.write(body)
+
+  def log_message(self, format, *args):
+    pass
+
+
+class MockKodiServer(http.server.ThreadingHTTPServer):
+  """Answers kodi_control.py's JSON-RPC calls and records Player.Open."""
+
+  daemon_threads = True
+
+  def __init__(self, host, port, nr_videos=NR_VIDEOS):
+    super().__init__((host, port), MockKodiHandler)
+    self.directory = "bench://videos/"
+    self.files = [{
+        "file": f"{self.directory}{i:03d}.mp4",
+        "label": f"{i:03d}.mp4"
+    } for i in range(nr_videos)]
+    self.requests = collections.Counter()
+    self.player_open = []
+    self.lock = threading.Lock()
+    logging.info(f"MockKodiServer: Listening on {host}:{port}")
+
+  def file_index(self, file_path):
+    for i, entry in enumerate(self.files):
+      if entry["file"] == file_path:
+        return i
+    return None
+
+
+class ProcessSampler:
+  """Samples CPU time and RSS of the service processes from /proc."""
+
+  def __init__(self, processes, interval_s=0.5):
+    self.processes = processes
+    self.interval_s = interval_s
+    self.available = os.path.isdir("/proc/self")
+    self.clock_ticks = os.sysconf("SC_CLK_TCK") if self.available else 100
+    self.rss_kb = collections.defaultdict(list)
+    self.cpu_start = {}
+    self.cpu_end = {}
+    self.stop_event = threading.Event()
+    if not self.available:
+      logging.warning("ProcessSampler: /proc not available, skipping CPU/RSS")
+
+  def cpu_seconds(self, pid):
+    with open(f"/proc/{pid}/stat") as f:
+      fields = f.read().rsplit(")", 1)[1].split()
+    # utime and stime are fields 14 and 15, counted from the pid.
+    return (int(fields[11]) + int(fields[12])) / self.clock_ticks
+
+  def rss(self, pid):
+    with open(f"/proc/{pid}/status") as f:
+      for line in f:
+        if line.startswith("VmRSS:"):
+          return int(line.split()[1])
+    return None
+
+  def snapshot(self, target):
+    for name, proc in self.processes.items():
+      try:
+        target[name] = self.cpu_seconds(proc.pid)
+        self.rss_kb[name].append(self.rss(proc.pid))
+      except (OSError, IndexError, ValueError):
+        pass
+
+  def run(self):
+    if not self.available:
+      return
+    self.snapshot(self.cpu_start)
+    while not self.stop_event.wait(self.interval_s):
+      self.snapshot(self.cpu_end)
+
+  def stop(self):
+    self.stop_event.set()
+    if self.available:
+      self.snapshot(self.cpu_end)
+
+  def results(self, wall_s):
+    results = {}
+    for name in self.processes:
+      rss = [r for r in self.rss_kb.get(name, []) if r is not None]
+      cpu_s = None
+      if name in self.cpu_start and name in self.cpu_end:
+        cpu_s = self.cpu_end[name] - self.cpu_start[name]
+      results[name] = {
+          "cpu_s": cpu_s,
+          "cpu_percent": 100.0 * cpu_s / wall_s if cpu_s is not None else None,
+          "rss_kb_max": max(rss) if rss else None,
+          "rss_kb_end": rss[-1] if rss else None,
+      }
+    return results
+
+
+class SignalStationBenchmark:
+
+  def __init__(self, args):
+    self.args = args
+    self.work_dir = tempfile.mkdtemp(prefix="signal_station_bench_")
+    self.audio_port = args.base_port
+    self.kodi_port = args.base_port + 1
+    self.audio_send_port = args.base_port + 2
+    self.adb_port = args.base_port + 3
+    self.tap_port = args.base_port + 4
+    self.kodi_http_port = args.base_port + 10
+    self.adb_log = os.path.join(self.work_dir, "adb_calls.jsonl")
+    self.processes = {}
+    self.log_files = {}
+
+  def make_audio_dir(self):
+    if self.args.audio_dir:
+      return self.args.audio_dir
+    audio_dir = os.path.join(self.work_dir, "sounds")
+    n_frames = int(self.args.sample_rate * self.args.clip_s)
+    silence = b"\x00\x00\x00\x00" * n_frames
+    dirs = {"dispatch": NR_DISPATCHES, "archive": NR_ARCHIVE}
+    dirs.update({f"flux_{i}": 1 for i in range(NUM_FLUX_POTIS)})
+    for name, count in dirs.items():
+      os.makedirs(os.path.join(audio_dir, name))
+      for i in range(count):
+        path = os.path.join(audio_dir, name, f"{i:03d}.wav")
+        with wave.open(path, "wb") as w:
+          w.setnchannels(2)
+          w.setsampwidth(2)
+          w.setframerate(self.args.sample_rate)
+          w.writeframes(silence)
+    return audio_dir
+
+  def make_fake_adb(self):
+    bin_dir = os.path.join(self.work_dir, "bin")
+    os.makedirs(bin_dir)
+    path = os.path.join(bin_dir, "adb")
+    with open(path, "w") as f:
+      f.write(FAKE_ADB.format(python=sys.executable,
+                              log=self.adb_log,
+                              device="127.0.0.1"))
+    os.chmod(path, 0o755)
+    return bin_dir
+
+  def make_env(self, bin_dir):
+    env = dict(os.environ)
+    env["PATH"] = bin_dir + os.pathsep + env.get("PATH", "")
+    env["PYTHONUNBUFFERED"] = "1"
+    if self.args.audio_sink == "file":
+      env["SDL_AUDIODRIVER"] = "disk"
+      env["SDL_DISKAUDIOFILE"] = os.path.join(self.work_dir, "audio.raw")
+    else:
+      env["SDL_AUDIODRIVER"] = "dummy"
+    return env
+
+  def start_process(self, name, cmd, env):
+    log_path = os.path.join(self.work_dir, f"{name}.log")
+    self.log_files[name] = open(log_path, "w")
+    self.processes[name] = subprocess.Popen(cmd,
+                                            cwd=REPO_DIR,
+                                            env=env,
+                                            stdout=self.log_files[name],
+                                            stderr=subprocess.STDOUT)
+    logging.info(f"Started {name} (pid {self.processes[name].pid})")
+
+  def start_services(self, serial_port, audio_dir, env):
+    cool_down = str(self.args.button_cool_down_s)
+    self.start_process("bridge", [
+        sys.executable, SERIAL_SCRIPT, "--serial_port", serial_port,
+        "--baudrate",
+        str(self.args.baudrate), "--protocol", self.args.protocol,
+        "--udp_send_targets",
+        f"127.0.0.1:{self.audio_port}", f"127.0.0.1:{self.kodi_port}",
+        f"127.0.0.1:{self.adb_port}", f"127.0.0.1:{self.tap_port}",
+        "--udp_listen_targets",
+        f"127.0.0.1:{self.audio_send_port}"
+    ], env)
+    self.start_process("audio", [
+        sys.executable, AUDIO_SCRIPT, "--udp_bind_port",
+        str(self.audio_port), "--udp_send_port",
+        str(self.audio_send_port), "--audio_dir", audio_dir,
+        "--button_cool_down_s", cool_down
+    ], env)
+    self.start_process("kodi", [
+        sys.executable, KODI_SCRIPT, "--ip", "127.0.0.1", "--port",
+        str(self.kodi_http_port), "--udp_bind_port",
+        str(self.kodi_port), "--dir", "bench://videos/",
+        "--button_cool_down_s", cool_down
+    ], env)
+    self.start_process("adb", [
+        sys.executable, ADB_SCRIPT, "--device_ip", "127.0.0.1",
+        "--udp_bind_host", "127.0.0.1", "--udp_bind_port",
+        str(self.adb_port), "--cooldown_s",
+        str(self.args.screen_on_time_s)
+    ], env)
+
+  def wait_until_ready(self, timeout_s=60):
+    deadline = time.time() + timeout_s
+    pending = dict(READY_MARKERS)
+    while pending:
+      for name in list(pending):
+        proc = self.processes[name]
+        if proc.poll() is not None:
+          raise RuntimeError(f"{name} exited with code {proc.returncode}, "
+                             f"see {self.log_files[name].name}")
+        with open(self.log_files[name].name) as f:
+          if pending[name] in f.read():
+            logging.info(f"{name} is ready")
+            del pending[name]
+      if time.time() > deadline:
+        raise RuntimeError(f"Timed out waiting for {sorted(pending)}")
+      time.sleep(0.2)
+
+  def stop_services(self):
+    for name, proc in self.processes.items():
+      if proc.poll() is None:
+        proc.send_signal(signal.SIGINT)
+    for name, proc in self.processes.items():
+      try:
+        proc.wait(timeout=5)
+      except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+    for f in self.log_files.values():
+      f.close()
+
+  def match_video(self, arduino, kodi):
+    latencies = []
+    unexpected = 0
+    pending = {k: collections.deque(v) for k, v in arduino.video_sends.items()}
+    for arrival, file_path in sorted(kodi.player_open):
+      index = kodi.file_index(file_path)
+      sends = pending.get(index)
+      if sends and sends[0] <= arrival:
+        latencies.append((arrival - sends.popleft()) * 1000.0)
+      else:
+        unexpected += 1
+    return latencies, unexpected
+
+  def match_flux(self, arduino, tap):
+    # Flux commands have no acknowledgement from the audio player, so they
+    # are matched where the bridge forwards them (the UDP tap).
+    latencies = []
+    unexpected = 0
+    pending = {k: collections.deque(v) for k, v in arduino.flux_sends.items()}
+    for arrival, data in tap.received:
+      if not data.startswith(b"flux_"):
+        continue
+      sends = pending.get(data)
+      if sends and sends[0] <= arrival:
+        latencies.append((arrival - sends.popleft()) * 1000.0)
+      else:
+        unexpected += 1
+    return latencies, unexpected
+
+  def check_alive(self):
+    for name, proc in self.processes.items():
+      if proc.poll() is not None:
+        raise RuntimeError(f"{name} exited with code {proc.returncode} "
+                           f"during the benchmark, see "
+                           f"{self.log_files[name].name}")
+
+  def match_audio(self, arduino):
+    latencies = []
+    unexpected = 0
+    pending = collections.deque(arduino.audio_sends)
+    for arrival in arduino.mode_button_on:
+      if pending and pending[0] <= arrival:
+        latencies.append((arrival - pending.popleft()) * 1000.0)
+      else:
+        unexpected += 1
+    return latencies, unexpected
+
+  def adb_results(self):
+    keyevents = collections.Counter()
+    invocations = 0
+    if os.path.exists(self.adb_log):
+      with open(self.adb_log) as f:
+        for line in f:
+          call = json.loads(line)
+          invocations += 1
+          if call["args"][-2:-1] == ["keyevent"]:
+            keyevents[call["args"][-1]] += 1
+    return {"invocations": invocations, "keyevents": dict(keyevents)}
+
+  def path_results(self, sent, latencies, unexpected, duration_s):
+    return {
+        "sent": sent,
+        "received": len(latencies),
+        "dropped": sent - len(latencies),
+        "unexpected": unexpected,
+        "throughput_per_s": len(latencies) / duration_s,
+        "latency_ms": percentiles(latencies),
+    }
+
+  def run(self):
+    args = self.args
+    arduino = FakeArduino(args.encoder_hz, args.volume_hz, args.button_hz,
+                          args.protocol)
+    kodi = MockKodiServer("127.0.0.1", self.kodi_http_port)
+    threading.Thread(target=kodi.serve_forever, daemon=True).start()
+    env = self.make_env(self.make_fake_adb())
+    audio_dir = self.make_audio_dir()
+    arduino.start()
+    tap = UDPTap("127.0.0.1", self.tap_port)
+    tap.start()
+    sampler = None
+    try:
+      self.start_services(arduino.port, audio_dir, env)
+      self.wait_until_ready()
+      time.sleep(args.warmup_s)
+      sampler = ProcessSampler(self.processes, args.sample_interval_s)
+      threading.Thread(target=sampler.run, daemon=True).start()
+      logging.info(f"Sending panel traffic for {args.duration_s}s")
+      wall_start = time.time()
+      duration_s = arduino.run_traffic(args.duration_s, self.check_alive)
+      time.sleep(args.drain_s)
+      self.check_alive()
+      sampler.stop()
+      wall_s = time.time() - wall_start
+    finally:
+      self.stop_services()
+      kodi.shutdown()
+      tap.close()
+      arduino.close()
+
+    exit_codes = {n: p.returncode for n, p in self.processes.items()}
+    processes = sampler.results(wall_s)
+    for name, code in exit_codes.items():
+      processes[name]["exit_code"] = code
+
+    video_latencies, video_unexpected = self.match_video(arduino, kodi)
+    audio_latencies, audio_unexpected = self.match_audio(arduino)
+    flux_latencies, flux_unexpected = self.match_flux(arduino, tap)
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+        },
+        "config": {
+            k: v for k, v in vars(args).items() if k not in ("output",
+                                                             "compare")
+        },
+        "duration_s": duration_s,
+        "traffic": {
+            "sent": dict(arduino.sent),
+            "serial_lines_per_s": sum(arduino.sent.values()) / duration_s,
+            "serial_bytes_per_s": arduino.bytes_sent / duration_s,
+            "serial_bytes_unwritten": arduino.bytes_unwritten,
+        },
+        "paths": {
+            "video": self.path_results(arduino.sent["video_play"],
+                                       video_latencies, video_unexpected,
+                                       duration_s),
+            "audio": self.path_results(arduino.sent["audio_play"],
+                                       audio_latencies, audio_unexpected,
+                                       duration_s),
+            "flux": self.path_results(
+                arduino.sent["flux_loop"] + arduino.sent["flux_volume"],
+                flux_latencies, flux_unexpected, duration_s),
+        },
+        "mode_button_off": arduino.mode_button_off,
+        "kodi_requests": dict(kodi.requests),
+        "adb": self.adb_results(),
+        "processes": processes,
+    }
+
+  def cleanup(self):
+    if self.args.keep_work_dir:
+      logging.info(f"Service logs kept in {self.work_dir}")
+    else:
+      shutil.rmtree(self.work_dir, ignore_errors=True)
+
+
+def flatten(results, prefix=""):
+  flat = {}
+  for key, value in results.items():
+    name = f"{prefix}{key}"
+    if isinstance(value, dict):
+      flat.update(flatten(value, name + "."))
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+      flat[name] = value
+  return flat
+
+
+def compare(previous, current):
+  prev = flatten({k: previous.get(k, {}) for k in ("paths", "processes")})
+  curr = flatten({k: current.get(k, {}) for k in ("paths", "processes")})
+  for key in sorted(curr):
+    if key not in prev or key.endswith(".exit_code"):
+      continue
+    old, new = prev[key], curr[key]
+    change = f"{100.0 * (new - old) / old:+.1f}%" if old else "n/a"
+    logging.info(f"{key}: {old:.3f} -> {new:.3f} ({change})")
+
+
+def summarize(results):
+  traffic = results["traffic"]
+  logging.info(f"Serial lines/s: {traffic['serial_lines_per_s']:.1f}, "
+               f"bytes/s: {traffic['serial_bytes_per_s']:.1f}")
+  for name, path in results["paths"].items():
+    latency = path["latency_ms"] or {}
+    logging.info(
+        f"{name}: sent {path['sent']}, received {path['received']}, "
+        f"dropped {path['dropped']}, p50 {latency.get('p50', 0):.1f}ms, "
+        f"p99 {latency.get('p99', 0):.1f}ms")
+  logging.info(f"adb: {results['adb']}")
+  for name, proc in results["processes"].items():
+    if proc["cpu_s"] is None:
+      logging.info(f"{name}: exit code {proc['exit_code']}")
+      continue
+    logging.info(f"{name}: CPU {proc['cpu_percent']:.1f}%, "
+                 f"max RSS {proc['rss_kb_max']} kB, "
+                 f"exit code {proc['exit_code']}")
+
+
+def main():
+  parser = argparse.ArgumentParser(
+      description="Load/soak benchmark for the full signal station chain")
+  parser.add_argument("--duration_s",
+                      type=float,
+                      default=30,
+                      help="Seconds of panel traffic to send")
+  parser.add_argument("--warmup_s",
+                      type=float,
+                      default=2,
+                      help="Seconds to wait after all services are ready")
+  parser.add_argument("--drain_s",
+                      type=float,
+                      default=3,
+                      help="Seconds to wait for late responses")
+  parser.add_argument("--encoder_hz",
+                      type=float,
+                      default=4,
+                      help="Encoder spin + press events per second")
+  parser.add_argument("--volume_hz",
+                      type=float,
+                      default=20,
+                      help="Flux volume sweep updates per second")
+  parser.add_argument("--button_hz",
+                      type=float,
+                      default=0.5,
+                      help="Dispatch/archive toggle presses per second")
+  parser.add_argument("--button_cool_down_s",
+                      type=float,
+                      default=0,
+                      help="Cool-down passed to audio and Kodi controllers")
+  parser.add_argument("--screen_on_time_s",
+                      type=int,
+                      default=2,
+                      help="Cool-down passed to the ADB controller")
+  parser.add_argument("--baudrate", type=int, default=115200)
+  parser.add_argument("--protocol",
+                      choices=["text", "framed"],
+                      default="text",
+                      help="Serial protocol of the fake Arduino and bridge")
+  parser.add_argument("--base_port",
+                      type=int,
+                      default=17070,
+                      help="First port; services use UDP base_port+0..3, "
+                      "the flux tap UDP base_port+4 and the mock Kodi HTTP "
+                      "base_port+10")
+  parser.add_argument("--audio_dir",
+                      default=None,
+                      help="Audio library (default: generated silent clips)")
+  parser.add_argument("--audio_sink",
+                      choices=["null", "file"],
+                      default="null",
+                      help="SDL audio driver: dummy or raw file output")
+  parser.add_argument("--sample_rate", type=int, default=44100)
+  parser.add_argument("--clip_s",
+                      type=float,
+                      default=0.2,
+                      help="Length of generated audio clips")
+  parser.add_argument("--sample_interval_s", type=float, default=0.5)
+  parser.add_argument("--output",
+                      default="signal_station_bench.json",
+                      help="JSON file for the results")
+  parser.add_argument("--compare",
+                      default=None,
+                      help="Previous results JSON to compare against")
+  parser.add_argument("--keep_work_dir",
+                      action="store_true",
+                      help="Keep service logs and fake adb call log")
+  args = parser.parse_args()
+
+  bench = SignalStationBenchmark(args)
+  try:
+    results = bench.run()
+  except Exception:
+    # Keep the service logs the error points to.
+    args.keep_work_dir = True
+    raise
+  finally:
+    bench.cleanup()
+
+  with open(args.output, "w") as f:
+    json.dump(results, f, indent=2)
+  logging.info(f"Wrote results to {args.output}")
+  summarize(results)
+
+  if args.compare:
+    with open(args.compare) as f:
+      compare(json.load(f), results)
+
+
+if __name__ == "__main__":
+  main()
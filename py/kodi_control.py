@@ -19,7 +19,7 @@ class KodiController:
                user="kodi",
                password="kodi",
                directory=None):
-    self.wait_for_host(ip, 8080)
+    self.wait_for_host(ip, int(port))
     self.url = f"http://{ip}:{port}/jsonrpc"
     self.auth = (user, password)
     # Auto-detect video source if not provided.
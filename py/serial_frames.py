@@ -0,0 +1,201 @@
+import logging
+
+# Compact framed serial protocol spoken by SerialCommunicator when the
+# controller is built with USE_FRAMED_SERIAL. Layout of one frame:
+#
+#   SYNC | LEN | TYPE | SEQ | PAYLOAD (LEN bytes) | CRC8
+#
+# CRC8 (poly 0x07) covers LEN, TYPE, SEQ and PAYLOAD. SEQ increments by one
+# per frame and wraps at 256, gaps are counted as lost frames. The controller
+# sends a TYPE_START frame before its first frame after boot, so a reset is
+# not mistaken for a gap. SYNC is not ASCII, so plain text lines (e.g. boot
+# messages) can still be interleaved; after a bad frame the text up to the
+# next line end is dropped as its remains.
+SYNC = 0xA5
+HEADER_SIZE = 4
+MAX_PAYLOAD = 64
+
+TYPE_TEXT = 0x01
+TYPE_AUDIO_PLAY = 0x02
+TYPE_VIDEO_PLAY = 0x03
+TYPE_FLUX = 0x04
+TYPE_START = 0x05
+
+AUDIO_MODES = ("dispatch", "archive")
+
+# TYPE_FLUX payload is a batch of (flux_index | FLUX_LOOP, volume) pairs.
+FLUX_LOOP = 0x80
+FLUX_NO_VOLUME = 0xFF
+
+
+def _crc8_table():
+  table = []
+  for byte in range(256):
+    crc = byte
+    for _ in range(8):
+      crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+    table.append(crc)
+  return bytes(table)
+
+
+CRC8_TABLE = _crc8_table()
+
+
+def crc8(data):
+  crc = 0
+  for byte in data:
+    crc = CRC8_TABLE[crc ^ byte]
+  return crc
+
+
+def encode_frame(msg_type, seq, payload):
+  if len(payload) > MAX_PAYLOAD:
+    raise ValueError(f"Payload too long: {len(payload)} > {MAX_PAYLOAD}")
+  body = bytes((len(payload), msg_type, seq & 0xFF)) + bytes(payload)
+  return bytes((SYNC, )) + body + bytes((crc8(body), ))
+
+
+def frame_to_lines(msg_type, payload):
+  """Converts a frame back to the text lines the old protocol would send."""
+  if msg_type == TYPE_TEXT:
+    line = bytes(payload).strip()
+    return [line] if line else []
+  if msg_type == TYPE_AUDIO_PLAY and len(payload) == 2:
+    if payload[0] >= len(AUDIO_MODES):
+      return []
+    return [f"{AUDIO_MODES[payload[0]]}, play, {payload[1]}".encode()]
+  if msg_type == TYPE_VIDEO_PLAY and len(payload) == 1:
+    return [f"video, {payload[0]}".encode()]
+  if msg_type == TYPE_FLUX and len(payload) % 2 == 0:
+    lines = []
+    for i in range(0, len(payload), 2):
+      flux_index = payload[i] & ~FLUX_LOOP
+      if payload[i] & FLUX_LOOP:
+        lines.append(f"flux_{flux_index}, loop, 0".encode())
+      if payload[i + 1] != FLUX_NO_VOLUME:
+        lines.append(f"flux_{flux_index}, volume, {payload[i + 1]}".encode())
+    return lines
+  return []
+
+
+class FrameEncoder:
+  """Python counterpart of the firmware encoder, used by the benchmark."""
+
+  def __init__(self):
+    self.seq = 0
+    self.started = False
+
+  def frame(self, msg_type, payload):
+    data = b""
+    if not self.started:
+      # Like the firmware, announce the (re)start before the first frame.
+      self.started = True
+      data = self.frame(TYPE_START, b"")
+    data += encode_frame(msg_type, self.seq, payload)
+    self.seq = (self.seq + 1) & 0xFF
+    return data
+
+  def text(self, line):
+    return self.frame(TYPE_TEXT, line.encode())
+
+  def audio_play(self, mode, index):
+    return self.frame(TYPE_AUDIO_PLAY, bytes((AUDIO_MODES.index(mode), index)))
+
+  def video_play(self, index):
+    return self.frame(TYPE_VIDEO_PLAY, bytes((index, )))
+
+  def flux(self, updates):
+    # updates: iterable of (flux_index, loop, volume or None)
+    payload = bytearray()
+    for flux_index, loop, volume in updates:
+      payload.append(flux_index | (FLUX_LOOP if loop else 0))
+      payload.append(FLUX_NO_VOLUME if volume is None else volume)
+    return self.frame(TYPE_FLUX, payload)
+
+
+class FrameDecoder:
+  """Incremental decoder for a byte stream of frames and plain text lines."""
+
+  def __init__(self):
+    self.buffer = bytearray()
+    self.text = bytearray()
+    self.expected_seq = None
+    self.frames = 0
+    self.lost_frames = 0
+    self.bad_frames = 0
+    # Bad frames since the last good one, they already show up in bad_frames.
+    self.pending_bad = 0
+    # After a bad frame the bytes up to the next line end or good frame are
+    # its remains, not text, and are dropped.
+    self.resyncing = False
+
+  def _drop_frame(self, reason):
+    self.bad_frames += 1
+    self.pending_bad += 1
+    self.resyncing = True
+    self.text.clear()
+    logging.warning(f"Dropping serial frame with {reason} "
+                    f"({self.bad_frames} total)")
+
+  def _take_text(self, data, lines):
+    for byte in data:
+      if self.resyncing:
+        self.resyncing = byte not in (0x0A, 0x0D)
+      elif byte in (0x0A, 0x0D):
+        line = bytes(self.text).strip()
+        if line:
+          lines.append(line)
+        self.text.clear()
+      elif 0x20 <= byte < 0x7F:
+        self.text.append(byte)
+
+  def _check_seq(self, seq):
+    if self.expected_seq is not None and seq != self.expected_seq:
+      gap = (seq - self.expected_seq) & 0xFF
+      lost = max(0, gap - self.pending_bad)
+      if lost:
+        self.lost_frames += lost
+        logging.warning(f"Lost {lost} serial frame(s) before seq {seq} "
+                        f"({self.lost_frames} total)")
+    self.expected_seq = (seq + 1) & 0xFF
+    self.pending_bad = 0
+
+  def feed(self, data):
+    """Returns the text lines for all complete frames/lines in data."""
+    self.buffer += data
+    lines = []
+    while self.buffer:
+      start = self.buffer.find(SYNC)
+      if start < 0:
+        self._take_text(self.buffer, lines)
+        self.buffer.clear()
+        break
+      if start:
+        self._take_text(self.buffer[:start], lines)
+        del self.buffer[:start]
+      if len(self.buffer) < HEADER_SIZE:
+        break
+      length = self.buffer[1]
+      if length > MAX_PAYLOAD:
+        self._drop_frame("bad length")
+        del self.buffer[0]
+        continue
+      end = HEADER_SIZE + length
+      if len(self.buffer) < end + 1:
+        break
+      if crc8(self.buffer[1:end]) != self.buffer[end]:
+        self._drop_frame("bad checksum")
+        del self.buffer[0]
+        continue
+      msg_type, seq = self.buffer[2], self.buffer[3]
+      payload = bytes(self.buffer[HEADER_SIZE:end])
+      del self.buffer[:end + 1]
+      self.frames += 1
+      self.resyncing = False
+      if msg_type == TYPE_START:
+        if self.expected_seq is not None:
+          logging.warning("Serial controller restarted")
+        self.expected_seq = None
+      self._check_seq(seq)
+      lines.extend(frame_to_lines(msg_type, payload))
+    return lines
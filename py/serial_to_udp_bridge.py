@@ -6,6 +6,8 @@ import time
 import logging
 import threading
 
+from serial_frames import FrameDecoder
+
 logging.basicConfig(level=logging.INFO,
                     format="%(asctime)s %(levelname)s: %(message)s")
 
@@ -32,6 +34,29 @@ def udp_receiver(ser, udp_send_targets, udp_listen_targets):
       break
 
 
+def forward_text(ser, udp_socket, udp_send_targets):
+  while True:
+    line = ser.readline().strip()
+    if line:
+      logging.info(f"Received from serial: {line}")
+      for host, port in udp_send_targets:
+        udp_socket.sendto(line, (host, port))
+    else:
+      time.sleep(0.01)
+
+
+def forward_framed(ser, udp_socket, udp_send_targets):
+  decoder = FrameDecoder()
+  while True:
+    # Blocks for the first byte (up to the serial timeout), then takes
+    # everything already buffered so a batch of frames costs one read.
+    data = ser.read(ser.in_waiting or 1)
+    for line in decoder.feed(data):
+      logging.info(f"Received from serial: {line}")
+      for host, port in udp_send_targets:
+        udp_socket.sendto(line, (host, port))
+
+
 def main():
   parser = argparse.ArgumentParser(
       description="Serial to UDP bridge (multi-target)")
@@ -41,12 +66,16 @@ def main():
                       help="Serial port (auto-detect USB if not provided)")
   parser.add_argument("--baudrate",
                       type=int,
-                      default=9700,
+                      default=115200,
                       help="Baud rate for serial connection")
   parser.add_argument("--timeout",
                       type=float,
                       default=2,
                       help="Timeout for serial connection")
+  parser.add_argument("--protocol",
+                      choices=["text", "framed"],
+                      default="text",
+                      help="Serial protocol spoken by the Arduino controller")
   parser.add_argument("--udp_send_targets",
                       nargs="+",
                       default=["127.0.0.1:7070", "127.0.0.1:7071"],
@@ -83,14 +112,10 @@ def main():
 
   # Forward serial to UDP targets
   try:
-    while True:
-      line = ser.readline().strip()
-      if line:
-        logging.info(f"Received from serial: {line}")
-        for host, port in udp_send_targets:
-          udp_socket.sendto(line, (host, port))
-      else:
-        time.sleep(0.01)
+    if args.protocol == "framed":
+      forward_framed(ser, udp_socket, udp_send_targets)
+    else:
+      forward_text(ser, udp_socket, udp_send_targets)
   except KeyboardInterrupt:
     logging.info("Exiting...")
   finally:
@@ -6,6 +6,7 @@ VENV_ACTIVATE=". env/bin/activate"
 
 SERIAL_SCRIPT="py/serial_to_udp_bridge.py"
 AUDIO_SCRIPT="py/audio_player.py"
+ASSETS_SCRIPT="py/audio_assets.py"
 KODI_SCRIPT="py/kodi_control.py"
 ADB_SCRIPT="py/adb_control.py"
 
@@ -16,6 +17,17 @@ ADB_BIND_PORT=7073
 
 SCREEN_ON_TIME_S=30
 
+# Rebuilt by py/audio_assets.py before the player starts (only changed sounds
+# are transcoded). audio_player.py falls back to data/sounds for out of date
+# modules. Set AUDIO_NORMALIZE_DBFS (e.g. -20) to normalize loudness.
+AUDIO_ASSETS_DIR="data/sounds_mixer"
+AUDIO_MANIFEST="$AUDIO_ASSETS_DIR/manifest.json"
+AUDIO_NORMALIZE_DBFS=${AUDIO_NORMALIZE_DBFS:-}
+ASSETS_ARGS="--output_dir $AUDIO_ASSETS_DIR${AUDIO_NORMALIZE_DBFS:+ --normalize_dbfs $AUDIO_NORMALIZE_DBFS}"
+
+# "framed" if the controller is built with USE_FRAMED_SERIAL
+SERIAL_PROTOCOL=${SERIAL_PROTOCOL:-text}
+
 # Try to get Android IP from config file, fallback to argument
 if [ -n "$1" ]; then
     ANDROID_IP=$1
@@ -64,8 +76,8 @@ tmux split-window -v
 PANES=($(tmux list-panes -F "#{pane_id}"))
 
 # Auto-restart loops in each pane:
-tmux send-keys -t ${PANES[0]} "$VENV_ACTIVATE && while true; do python3 $SERIAL_SCRIPT --udp_send_targets 127.0.0.1:$AUDIO_BIND_PORT 127.0.0.1:$KODI_BIND_PORT 127.0.0.1:$ADB_BIND_PORT --udp_listen_targets 127.0.0.1:$AUDIO_SEND_PORT --serial_port $ARDUINO_PORT; echo \"[$(date)] $SERIAL_SCRIPT crashed. Restarting in 1 second...\"; sleep 1; done" $CM
-tmux send-keys -t ${PANES[1]} "$VENV_ACTIVATE && while true; do python3 $AUDIO_SCRIPT --udp_bind_port $AUDIO_BIND_PORT --udp_send_port $AUDIO_SEND_PORT; echo \"[$(date)] $AUDIO_SCRIPT crashed. Restarting in 1 second...\"; sleep 1; done" $CM
+tmux send-keys -t ${PANES[0]} "$VENV_ACTIVATE && while true; do python3 $SERIAL_SCRIPT --udp_send_targets 127.0.0.1:$AUDIO_BIND_PORT 127.0.0.1:$KODI_BIND_PORT 127.0.0.1:$ADB_BIND_PORT --udp_listen_targets 127.0.0.1:$AUDIO_SEND_PORT --serial_port $ARDUINO_PORT --protocol $SERIAL_PROTOCOL; echo \"[$(date)] $SERIAL_SCRIPT crashed. Restarting in 1 second...\"; sleep 1; done" $CM
+tmux send-keys -t ${PANES[1]} "$VENV_ACTIVATE && python3 $ASSETS_SCRIPT $ASSETS_ARGS; while true; do python3 $AUDIO_SCRIPT --udp_bind_port $AUDIO_BIND_PORT --udp_send_port $AUDIO_SEND_PORT --manifest $AUDIO_MANIFEST; echo \"[$(date)] $AUDIO_SCRIPT crashed. Restarting in 1 second...\"; sleep 1; done" $CM
 tmux send-keys -t ${PANES[2]} "$VENV_ACTIVATE && while true; do python3 $KODI_SCRIPT --udp_bind_port $KODI_BIND_PORT --ip $ANDROID_IP --dir $KODI_FOLDER; echo \"[$(date)] $KODI_SCRIPT crashed. Restarting in 1 second...\"; sleep 1; done" $CM
 tmux send-keys -t ${PANES[3]} "$VENV_ACTIVATE && while true; do python3 $ADB_SCRIPT --device_ip $ANDROID_IP --udp_bind_port $ADB_BIND_PORT --cooldown_s $SCREEN_ON_TIME_S; echo \"[$(date)] $ADB_SCRIPT crashed. Restarting in 1 second...\"; sleep 1; done" $CM
 